@@ -13,6 +13,16 @@ BATCH_SIZE = 10  # 每批翻译的条目数量（仅在禁用智能批处理时
 USE_SMART_BATCHING = True  # 是否启用智能批处理（基于内容长度）
 MAX_CHARS_PER_REQUEST = 4000  # 每次API请求的最大字符数
 
+# 模糊翻译记忆配置
+FUZZY_MATCH = False  # 是否启用模糊翻译记忆，只在数字、标点或大小写上不同的条目直接预填并标记为fuzzy
+FUZZY_THRESHOLD = 0.9  # 相似条目作为参考译文附入提示词的相似度阈值（0-1）
+TM_FILES = []  # 作为翻译记忆来源的已翻译.po文件列表
+
+# 预算配置
+MAX_TOKENS_TOTAL = None  # 本次运行允许消耗的token总数上限，None表示不限制
+MAX_REQUESTS = None  # 本次运行允许发送的API请求数上限（含重试），None表示不限制
+SKIP_TRANSLATED = False  # 是否跳过已有译文的条目，用于从中断处继续翻译
+
 # 调试配置
 DEBUG = False  # 是否启用调试模式，输出详细的API交互信息
 
@@ -10,7 +10,10 @@ import requests
 import json
 import argparse
 import os
+import sys
 import time
+import zlib
+from difflib import SequenceMatcher
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
@@ -25,10 +28,231 @@ class POEntry:
     msgstr: str
     line_start: int
     line_end: int
+    fuzzy: bool = False
+
+
+@dataclass
+class TranslationPlan:
+    """翻译预估结果结构"""
+    entries_total: int
+    entries_to_send: int
+    entries_reused: int
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    estimated_seconds: float
+    concurrency: int
+    requests_within_budget: int
+
+
+class TranslationMemory:
+    """
+    模糊翻译记忆索引
+
+    find_equivalent按归一化文本（忽略大小写、标点，数字视为同一符号）做精确查找，
+    只有这类仅在数字、标点或大小写上不同的条目才可直接复用译文；
+    find使用字符n-gram的MinHash签名配合LSH分桶召回候选，再用SequenceMatcher校验相似度，
+    用于为相似条目提供参考译文，条目数达到十万级时仍可快速查询。
+    """
+
+    NGRAM_SIZE = 3
+    NUM_BINS = 18
+    BAND_SIZE = 3
+    MAX_BUCKET_CANDIDATES = 32
+    MAX_VERIFY_CANDIDATES = 8
+    NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+    def __init__(self, threshold: float = 0.9):
+        """
+        初始化翻译记忆
+
+        Args:
+            threshold: 判定为近似重复的最低相似度（0-1）
+        """
+        self.threshold = threshold
+        self.sources: List[str] = []
+        self.translations: List[str] = []
+        self._normalized: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, ...], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """
+        归一化文本：小写、数字统一为0、去除标点（保留占位符花括号）、合并空白
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            归一化后的文本（只含标点的文本无法归一化，保留原文）
+        """
+        normalized = cls.NUMBER_PATTERN.sub('0', text.lower())
+        normalized = re.sub(r'[^\w\s{}]', ' ', normalized)
+        return ' '.join(normalized.split()) or text.strip()
+
+    def _signature(self, normalized: str) -> List[int]:
+        """
+        计算单次哈希分箱的MinHash签名（空箱向右借用相邻箱的值）
+
+        Args:
+            normalized: 归一化后的文本
+
+        Returns:
+            长度为NUM_BINS的签名，文本为空时返回空列表
+        """
+        padded = f" {normalized} "
+        shingles = {padded[i:i + self.NGRAM_SIZE] for i in range(max(len(padded) - self.NGRAM_SIZE + 1, 1))}
+        signature: List[Optional[int]] = [None] * self.NUM_BINS
+        for shingle in shingles:
+            h = zlib.crc32(shingle.encode('utf-8'))
+            slot, value = h % self.NUM_BINS, h // self.NUM_BINS
+            if signature[slot] is None or value < signature[slot]:
+                signature[slot] = value
+
+        if all(value is None for value in signature):
+            return []
+
+        # 空箱填充：沿环向右找到第一个非空箱，加上距离偏移以区分来源
+        for slot in range(self.NUM_BINS):
+            if signature[slot] is None:
+                distance = 1
+                while signature[(slot + distance) % self.NUM_BINS] is None:
+                    distance += 1
+                signature[slot] = signature[(slot + distance) % self.NUM_BINS] + distance * 0x9E3779B1
+        return signature
+
+    def _band_keys(self, normalized: str) -> List[Tuple[int, ...]]:
+        signature = self._signature(normalized)
+        return [
+            (band,) + tuple(signature[band:band + self.BAND_SIZE])
+            for band in range(0, len(signature), self.BAND_SIZE)
+        ]
+
+    def add(self, source: str, translation: str) -> int:
+        """
+        向索引中添加一条翻译
+
+        Args:
+            source: 原文
+            translation: 译文
+
+        Returns:
+            该条目在索引中的位置
+        """
+        idx = len(self.sources)
+        normalized = self.normalize(source)
+        self.sources.append(source)
+        self.translations.append(translation)
+        self._normalized.append(normalized)
+        self._exact.setdefault(normalized, idx)
+        for key in self._band_keys(normalized):
+            self._buckets.setdefault(key, []).append(idx)
+        return idx
+
+    def find_equivalent(self, source: str) -> Optional[int]:
+        """
+        查找与原文只在数字、标点或大小写上不同的条目
+
+        Args:
+            source: 待查询的原文
+
+        Returns:
+            条目位置，未找到时返回None
+        """
+        return self._exact.get(self.normalize(source))
+
+    def find(self, source: str) -> Optional[Tuple[int, float]]:
+        """
+        查找与原文最相似且达到阈值的条目
+
+        Args:
+            source: 待查询的原文
+
+        Returns:
+            (条目位置, 相似度)，未找到时返回None
+        """
+        normalized = self.normalize(source)
+        if normalized in self._exact:
+            return self._exact[normalized], 1.0
+
+        # 统计候选与查询共享的桶数，共享越多越可能相似；只取每个桶中最近加入的若干条，避免热门桶拖慢查询
+        hits: Dict[int, int] = {}
+        for key in self._band_keys(normalized):
+            for idx in self._buckets.get(key, ())[-self.MAX_BUCKET_CANDIDATES:]:
+                hits[idx] = hits.get(idx, 0) + 1
+        candidates = sorted(hits, key=hits.get, reverse=True)[:self.MAX_VERIFY_CANDIDATES]
+
+        best = None
+        for idx in candidates:
+            other = self._normalized[idx]
+            # 长度差过大时相似度上限已低于阈值，直接跳过
+            if 2 * min(len(normalized), len(other)) < self.threshold * (len(normalized) + len(other)):
+                continue
+            matcher = SequenceMatcher(None, normalized, other)
+            if matcher.quick_ratio() < self.threshold:
+                continue
+            score = matcher.ratio()
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (idx, score)
+        return best
+
+    def lookup(self, source: str) -> Optional[Tuple[str, float]]:
+        """
+        查找原文的模糊翻译建议
+
+        Args:
+            source: 待查询的原文
+
+        Returns:
+            (建议译文, 相似度)，未找到时返回None
+        """
+        match = self.find(source)
+        if match is None:
+            return None
+        idx, score = match
+        return self.adapt_numbers(self.sources[idx], source, self.translations[idx]), score
+
+    @classmethod
+    def adapt_numbers(cls, matched_source: str, source: str, translation: str) -> str:
+        """
+        将匹配原文中的数字替换为当前原文中的数字（如"Level 1" -> "Level 2"）
+
+        Args:
+            matched_source: 翻译记忆中匹配到的原文
+            source: 当前原文
+            translation: 匹配原文对应的译文
+
+        Returns:
+            调整数字后的译文，无法一一对应时原样返回
+        """
+        old_numbers = cls.NUMBER_PATTERN.findall(matched_source)
+        new_numbers = cls.NUMBER_PATTERN.findall(source)
+        if old_numbers == new_numbers or len(old_numbers) != len(new_numbers):
+            return translation
+
+        mapping = {}
+        for old, new in zip(old_numbers, new_numbers):
+            if mapping.setdefault(old, new) != new:
+                return translation
+        return cls.NUMBER_PATTERN.sub(lambda m: mapping.get(m.group(0), m.group(0)), translation)
 
 
 class POTranslator:
-    def __init__(self, api_key: str = None, api_url: str = None, max_chars_per_request: int = 4000, debug: bool = False):
+    # 耗时预估参数：每次请求的固定开销、输出速度以及批次之间的等待时间
+    REQUEST_OVERHEAD_SECONDS = 2.0
+    OUTPUT_TOKENS_PER_SECOND = 40.0
+    BATCH_DELAY_SECONDS = 1
+    # 中日韩文字及全角标点，估算token时每个字符约计1个token
+    CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+    # 每个批次提示词中最多附带的参考译文数
+    MAX_REFERENCE_TRANSLATIONS = 10
+    
+    def __init__(self, api_key: str = None, api_url: str = None, max_chars_per_request: int = 4000, debug: bool = False,
+                 max_tokens_total: int = None, max_requests: int = None, mock: bool = False):
         """
         初始化翻译器
         
@@ -37,17 +261,44 @@ class POTranslator:
             api_url: DeepSeek API URL，默认为官方API
             max_chars_per_request: 每次API请求的最大字符数
             debug: 是否启用调试模式
+            max_tokens_total: 本次运行允许消耗的token总数上限，None表示不限制
+            max_requests: 本次运行允许发送的API请求数上限（含重试），None表示不限制
+            mock: 是否使用模拟后端（不调用API，返回"[目标语言] 原文"形式的译文，用于本地测试）
         """
         self.api_key = api_key
         self.api_url = api_url or "https://api.deepseek.com/chat/completions"
         self.max_chars_per_request = max_chars_per_request
         self.debug = debug
+        self.max_tokens_total = max_tokens_total
+        self.max_requests = max_requests
+        self.mock = mock
         self.entries: List[POEntry] = []
+        self.translation_memory: Optional[TranslationMemory] = None
+        self._reference_matches: Dict[str, Optional[int]] = {}
+        self.requests_sent = 0
+        self.tokens_used = 0
+        # 用API返回的usage校准token估算：累计实际值与对应的估算值
+        self.reported_tokens = 0
+        self.estimated_tokens = 0
+        self.budget_exhausted = False
         
     def parse_po_file(self, file_path: str) -> List[POEntry]:
         """
         解析.po文件，提取所有条目
         
+        Args:
+            file_path: .po文件路径
+            
+        Returns:
+            提取的PO条目列表
+        """
+        self.entries = self._read_entries(file_path)
+        return self.entries
+    
+    def _read_entries(self, file_path: str) -> List[POEntry]:
+        """
+        读取.po文件中的所有有效条目（不修改当前翻译器状态）
+        
         Args:
             file_path: .po文件路径
             
@@ -74,7 +325,6 @@ class POTranslator:
             else:
                 i += 1
         
-        self.entries = entries
         return entries
     
     def _parse_entry(self, lines: List[str], start_idx: int) -> Optional[POEntry]:
@@ -103,8 +353,10 @@ class POTranslator:
                 entry.source_location = lines[i].strip().split('SourceLocation:', 1)[1].strip()
                 i += 1
             
-            # 跳过其他注释行（如#:行）
+            # 跳过其他注释行（如#:行），记录fuzzy标记
             while i < len(lines) and lines[i].strip().startswith('#'):
+                if lines[i].strip().startswith('#,') and 'fuzzy' in lines[i]:
+                    entry.fuzzy = True
                 i += 1
             
             # 解析msgctxt
@@ -158,7 +410,7 @@ class POTranslator:
     
     def _estimate_token_count(self, text: str) -> int:
         """
-        估算文本的token数量（简单估算，1个token约等于4个字符）
+        估算文本的token数量（简单估算，中日韩字符按1个字符1个token，其余按4个字符1个token）
         
         Args:
             text: 输入文本
@@ -166,22 +418,21 @@ class POTranslator:
         Returns:
             估算的token数量
         """
-        return len(text) // 4 + 1
+        cjk_count = len(self.CJK_PATTERN.findall(text))
+        return cjk_count + (len(text) - cjk_count) // 4 + 1
     
-    def _estimate_batch_content_length(self, msgids: List[str], prompt_template: str) -> int:
+    def _estimate_batch_content_length(self, msgids: List[str], target_language: str = "中文") -> int:
         """
-        估算批次内容的总长度
+        估算批次内容的总长度（与实际发送的提示词一致，包含参考译文）
         
         Args:
             msgids: 待翻译的文本列表
-            prompt_template: 提示模板
+            target_language: 目标语言
             
         Returns:
             估算的总字符数
         """
-        combined_text = "|".join(msgids)
-        full_prompt = prompt_template.replace("{combined_text}", combined_text)
-        return len(full_prompt)
+        return len(self._build_prompt(msgids, target_language, self._reference_translations(msgids)))
     
     def _create_smart_batches(self, msgids: List[str], target_language: str = "中文") -> List[List[str]]:
         """
@@ -194,28 +445,13 @@ class POTranslator:
             智能分组后的批次列表
         """
         
-        prompt_template = f"""请将以下文本翻译成{target_language}。每个待翻译文本之间用"|"符号分隔，请在翻译结果中保持相同的"|"分隔格式。
-
-原文：
-{{combined_text}}
-
-翻译要求：
-1. "|"符号仅用于分隔不同的翻译条目，不要在单个条目内部使用"|"
-2. 保持每个条目内部的原有格式和标点符号（如逗号、冒号、括号等）
-3. 原文中的逗号在译文中应保持为逗号，不要替换为"|"分隔符
-4. 如果是游戏界面相关的术语，请使用常见的游戏本地化翻译
-5. 保持专业和准确的翻译，维护原文的内部结构完整性
-6. 用"|"分隔每个翻译结果，确保翻译结果数量与原文一致
-7. 除了翻译结果外，不要输出任何其他多余文文内容
-"""
-        
         batches = []
         current_batch = []
         
         for msgid in msgids:
             # 检查添加当前项目后是否超出限制
             test_batch = current_batch + [msgid]
-            estimated_length = self._estimate_batch_content_length(test_batch, prompt_template)
+            estimated_length = self._estimate_batch_content_length(test_batch, target_language)
             
             if estimated_length > self.max_chars_per_request and current_batch:
                 # 如果超出限制且当前批次不为空，保存当前批次并开始新批次
@@ -226,7 +462,7 @@ class POTranslator:
                 current_batch.append(msgid)
                 
             # 检查单个项目是否过长
-            single_item_length = self._estimate_batch_content_length([msgid], prompt_template)
+            single_item_length = self._estimate_batch_content_length([msgid], target_language)
             if single_item_length > self.max_chars_per_request:
                 print(f"警告：单个条目过长（{single_item_length} 字符），可能需要拆分: {msgid[:100]}...")
           # 添加最后一个批次
@@ -247,38 +483,23 @@ class POTranslator:
         Returns:
             翻译结果列表
         """
-        if not self.api_key:
+        if not self.api_key and not self.mock:
             raise ValueError("API密钥未设置")
         
+        # 构建翻译提示（参考译文只查找一次，提示词和token估算共用）
+        references = self._reference_translations(msgids)
+        prompt = self._build_prompt(msgids, target_language, references)
+        
         # 检查批次大小
-        combined_text = "|".join(msgids)
-        if len(combined_text) > self.max_chars_per_request:
-            print(f"警告：批次内容过长（{len(combined_text)} 字符），可能导致API调用失败")        # 构建翻译提示
-        prompt = f"""请将以下文本翻译成{target_language}。每个待翻译文本之间用"|"符号分隔，请在翻译结果中保持相同的"|"分隔格式。
-
-原文：
-{combined_text}
-
-翻译要求：
-1. "|"符号仅用于分隔不同的翻译条目，不要在单个条目内部使用"|"
-2. 保持每个条目内部的原有格式和标点符号（如逗号、冒号、括号等）
-3. 原文中的逗号在译文中应保持为逗号，不要替换为"|"分隔符
-4. 如果是游戏界面相关的术语，请使用常见的游戏本地化翻译
-5. 保持专业和准确的翻译，维护原文的内部结构完整性
-6. 用"|"分隔每个翻译结果，确保翻译结果数量与原文一致
-7. 除了翻译结果外，不要输出任何其他多余文本内容
-
-示例：
-原文: Name:{{name}}, Level:{{level}}|Health:{{hp}}, Mana:{{mp}}
-译文: 名称:{{name}}，等级:{{level}}|生命值:{{hp}}，魔法值:{{mp}}
-"""
+        if len(prompt) > self.max_chars_per_request:
+            print(f"警告：批次内容过长（{len(prompt)} 字符），可能导致API调用失败")
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
           # 动态调整max_tokens基于输入长度
-        estimated_output_tokens = self._estimate_token_count(combined_text) * 2  # 翻译通常比原文长
+        estimated_input_tokens, estimated_output_tokens = self._estimate_batch_tokens(msgids, target_language, references)
         max_tokens = min(max(estimated_output_tokens, 1000), 4000)  # 限制在1000-4000之间
         
         data = {
@@ -294,8 +515,15 @@ class POTranslator:
         }
 
         for attempt in range(retry_count):
+            # 预算检查：超出上限时不再发送请求
+            if not self._within_budget(estimated_input_tokens + min(estimated_output_tokens, max_tokens)):
+                print(f"  已达到预算上限（已发送 {self.requests_sent} 次请求，已消耗约 {self.tokens_used} token），停止发送请求")
+                self.budget_exhausted = True
+                return [""] * len(msgids)
+            
             try:
                 print(f"  发送API请求（尝试 {attempt + 1}/{retry_count}）...")
+                self.requests_sent += 1
                 
                 # Debug: 输出发送给AI的完整内容
                 if self.debug:
@@ -309,11 +537,22 @@ class POTranslator:
                     print(prompt)
                     print("=" * 50)
                 
-                response = requests.post(self.api_url, headers=headers, json=data, timeout=120)
-                response.raise_for_status()
-                
-                result = response.json()
+                if self.mock:
+                    result = self._mock_response(msgids, target_language)
+                else:
+                    response = requests.post(self.api_url, headers=headers, json=data, timeout=120)
+                    response.raise_for_status()
+                    
+                    result = response.json()
                 translated_text = result["choices"][0]["message"]["content"].strip()
+                estimated_total = estimated_input_tokens + self._estimate_token_count(translated_text)
+                reported_total = result.get("usage", {}).get("total_tokens")
+                if reported_total is not None:
+                    self.reported_tokens += reported_total
+                    self.estimated_tokens += estimated_total
+                    self.tokens_used += reported_total
+                else:
+                    self.tokens_used += self._calibrate_tokens(estimated_total)
                 
                 # Debug: 输出AI的回应内容
                 if self.debug:
@@ -366,6 +605,138 @@ class POTranslator:
         print(f"  所有重试都失败，返回空翻译结果")
         return [""] * len(msgids)
     
+    def _mock_response(self, msgids: List[str], target_language: str) -> Dict:
+        """
+        生成与API返回格式相同的模拟响应
+        
+        Args:
+            msgids: 待翻译的文本列表
+            target_language: 目标语言
+            
+        Returns:
+            模拟的API响应
+        """
+        content = "|".join(f"[{target_language}] {msgid}" for msgid in msgids)
+        return {"choices": [{"message": {"content": content}}]}
+    
+    def _build_prompt(self, msgids: List[str], target_language: str = "中文",
+                      references: List[Tuple[str, str]] = None) -> str:
+        """
+        构建批量翻译的提示词
+        
+        Args:
+            msgids: 待翻译的文本列表
+            target_language: 目标语言
+            references: _reference_translations返回的参考译文，None表示不附带
+            
+        Returns:
+            发送给API的提示词
+        """
+        combined_text = "|".join(msgids)
+        reference_text = ""
+        if references:
+            reference_lines = "\n".join(f"{source} => {translation}" for source, translation in references)
+            reference_text = f"""
+参考译文（相似原文的已有翻译，仅用于保持术语和风格一致，请按原文实际含义翻译，不要输出参考译文）：
+{reference_lines}
+"""
+        return f"""请将以下文本翻译成{target_language}。每个待翻译文本之间用"|"符号分隔，请在翻译结果中保持相同的"|"分隔格式。
+
+原文：
+{combined_text}
+{reference_text}
+翻译要求：
+1. "|"符号仅用于分隔不同的翻译条目，不要在单个条目内部使用"|"
+2. 保持每个条目内部的原有格式和标点符号（如逗号、冒号、括号等）
+3. 原文中的逗号在译文中应保持为逗号，不要替换为"|"分隔符
+4. 如果是游戏界面相关的术语，请使用常见的游戏本地化翻译
+5. 保持专业和准确的翻译，维护原文的内部结构完整性
+6. 用"|"分隔每个翻译结果，确保翻译结果数量与原文一致
+7. 除了翻译结果外，不要输出任何其他多余文本内容
+
+示例：
+原文: Name:{{name}}, Level:{{level}}|Health:{{hp}}, Mana:{{mp}}
+译文: 名称:{{name}}，等级:{{level}}|生命值:{{hp}}，魔法值:{{mp}}
+"""
+    
+    def _reference_translations(self, msgids: List[str]) -> List[Tuple[str, str]]:
+        """
+        从翻译记忆中查找与批次中原文相似的已有翻译，作为提示词中的参考
+        
+        Args:
+            msgids: 待翻译的文本列表
+            
+        Returns:
+            (相似原文, 译文)列表
+        """
+        if self.translation_memory is None:
+            return []
+        
+        memory = self.translation_memory
+        references = []
+        seen = set()
+        for msgid in msgids:
+            # 每个原文只查找一次翻译记忆，分批、预估和发送请求时复用
+            if msgid not in self._reference_matches:
+                match = memory.find(msgid)
+                self._reference_matches[msgid] = match[0] if match is not None else None
+            idx = self._reference_matches[msgid]
+            if idx is None or idx in seen:
+                continue
+            seen.add(idx)
+            references.append((memory.sources[idx], memory.translations[idx]))
+            if len(references) >= self.MAX_REFERENCE_TRANSLATIONS:
+                break
+        return references
+    
+    def _estimate_batch_tokens(self, msgids: List[str], target_language: str = "中文",
+                               references: List[Tuple[str, str]] = None) -> Tuple[int, int]:
+        """
+        估算单个批次请求的输入和输出token数量
+        
+        Args:
+            msgids: 待翻译的文本列表
+            target_language: 目标语言
+            references: _reference_translations返回的参考译文，None表示不附带
+            
+        Returns:
+            (输入token数, 输出token数)
+        """
+        input_tokens = self._estimate_token_count(self._build_prompt(msgids, target_language, references))
+        output_tokens = self._estimate_token_count("|".join(msgids)) * 2  # 翻译通常比原文长
+        return input_tokens, output_tokens
+    
+    def _within_budget(self, next_tokens: int) -> bool:
+        """
+        检查再发送一次请求是否仍在预算之内
+        
+        Args:
+            next_tokens: 下一次请求预计消耗的token数
+            
+        Returns:
+            是否允许发送
+        """
+        if self.max_requests is not None and self.requests_sent >= self.max_requests:
+            return False
+        if (self.max_tokens_total is not None and
+                self.tokens_used + self._calibrate_tokens(next_tokens) > self.max_tokens_total):
+            return False
+        return True
+    
+    def _calibrate_tokens(self, estimated: int) -> int:
+        """
+        按已返回的usage与估算值之比修正token估算（估算偏低时放大，不会缩小）
+        
+        Args:
+            estimated: 估算的token数
+            
+        Returns:
+            修正后的token数
+        """
+        if not self.estimated_tokens:
+            return estimated
+        return int(estimated * max(self.reported_tokens / self.estimated_tokens, 1.0)) + 1
+    
     def _parse_translation_result(self, translated_text: str, expected_count: int) -> List[str]:
         """
         解析翻译结果
@@ -403,24 +774,95 @@ class POTranslator:
         
         return translations
     
-    def translate_entries(self, batch_size: int = 10, target_language: str = "中文", use_smart_batching: bool = True):
+    def enable_fuzzy_matching(self, threshold: float = 0.9, tm_files: List[str] = None) -> TranslationMemory:
         """
-        翻译所有条目
+        构建模糊翻译记忆，之后translate_entries会先用它预填近似重复条目
         
         Args:
-            batch_size: 每批翻译的条目数量（仅在不使用智能批处理时有效）
-            target_language: 目标语言
-            use_smart_batching: 是否使用智能批处理（考虑内容长度）
+            threshold: 判定为近似重复的最低相似度（0-1）
+            tm_files: 额外作为翻译记忆来源的.po文件列表
+            
+        Returns:
+            构建好的翻译记忆
         """
-        if not self.entries:
-            print("没有找到需要翻译的条目")
-            return
+        memory = TranslationMemory(threshold)
+        sources = [self.entries] + [self._read_entries(tm_file) for tm_file in tm_files or []]
+        for entries in sources:
+            for entry in entries:
+                if entry.msgstr and not entry.fuzzy:
+                    memory.add(entry.msgid, entry.msgstr)
         
-        print(f"开始翻译 {len(self.entries)} 个条目...")
+        self.translation_memory = memory
+        self._reference_matches.clear()
+        print(f"翻译记忆：已索引 {len(memory)} 条已有译文")
+        return memory
+    
+    def _match_translation_memory(self) -> Tuple[List[POEntry], Dict[int, List[POEntry]], List[Tuple[POEntry, str, bool]]]:
+        """
+        用翻译记忆确定可直接复用译文的条目，并将剩余条目中的等价条目归组（不修改条目）
         
-        # 提取所有msgid
-        msgids = [entry.msgid for entry in self.entries]
+        Returns:
+            (需要调用API翻译的代表条目列表, 代表条目位置到其等价条目列表的映射, (条目, 译文, 是否fuzzy)预填列表)
+        """
+        memory = self.translation_memory
+        groups: Dict[str, int] = {}
+        pending: List[POEntry] = []
+        followers: Dict[int, List[POEntry]] = {}
+        prefills: List[Tuple[POEntry, str, bool]] = []
+        
+        for entry in self.entries:
+            # 已有确定译文的条目保持不变
+            if entry.msgstr and not entry.fuzzy:
+                continue
+            
+            # 只在数字、标点或大小写上不同的条目直接复用译文，其余相似条目仍交给API翻译
+            idx = memory.find_equivalent(entry.msgid)
+            if idx is not None:
+                translation = memory.adapt_numbers(memory.sources[idx], entry.msgid, memory.translations[idx])
+                prefills.append((entry, translation, entry.msgid != memory.sources[idx]))
+                continue
+            
+            # 与本次待翻译条目等价的，复用代表条目的翻译结果
+            normalized = TranslationMemory.normalize(entry.msgid)
+            if normalized in groups:
+                followers.setdefault(groups[normalized], []).append(entry)
+                continue
+            
+            groups[normalized] = len(pending)
+            pending.append(entry)
+        
+        return pending, followers, prefills
+    
+    def _prepare_pending(self, skip_translated: bool = False) -> Tuple[List[POEntry], Dict[int, List[POEntry]], List[Tuple[POEntry, str, bool]]]:
+        """
+        确定需要调用API翻译的条目（不修改条目，预估和正式翻译共用）
         
+        Args:
+            skip_translated: 是否跳过已有确定译文的条目（用于从中断处继续翻译）
+            
+        Returns:
+            (需要调用API翻译的条目列表, 代表条目位置到其等价条目列表的映射, (条目, 译文, 是否fuzzy)预填列表)
+        """
+        if self.translation_memory is not None:
+            return self._match_translation_memory()
+        if skip_translated:
+            return [entry for entry in self.entries if not entry.msgstr or entry.fuzzy], {}, []
+        return list(self.entries), {}, []
+    
+    def _create_batches(self, msgids: List[str], batch_size: int = 10, target_language: str = "中文",
+                        use_smart_batching: bool = True) -> List[List[str]]:
+        """
+        按批处理方式将待翻译文本分组，并打印批次信息
+        
+        Args:
+            msgids: 待翻译的文本列表
+            batch_size: 每批翻译的条目数量（仅在不使用智能批处理时有效）
+            target_language: 目标语言
+            use_smart_batching: 是否使用智能批处理（考虑内容长度）
+            
+        Returns:
+            批次列表
+        """
         if use_smart_batching:
             # 使用智能批处理
             batches = self._create_smart_batches(msgids, target_language)
@@ -437,6 +879,129 @@ class POTranslator:
                 batches.append(msgids[i:i + batch_size])
             print(f"固定批处理：创建了 {len(batches)} 个批次，每批最多 {batch_size} 个条目")
         
+        return batches
+    
+    def plan_translation(self, batch_size: int = 10, target_language: str = "中文", use_smart_batching: bool = True,
+                         skip_translated: bool = False, concurrency: int = 1) -> TranslationPlan:
+        """
+        离线执行与translate_entries相同的筛选和分批流程，预估请求数、token数和耗时（不调用API）
+        
+        Args:
+            batch_size: 每批翻译的条目数量（仅在不使用智能批处理时有效）
+            target_language: 目标语言
+            use_smart_batching: 是否使用智能批处理（考虑内容长度）
+            skip_translated: 是否跳过已有确定译文的条目
+            concurrency: 预估耗时时假设的并发请求数
+            
+        Returns:
+            翻译预估结果
+        """
+        pending, followers, prefills = self._prepare_pending(skip_translated)
+        batches = self._create_batches([entry.msgid for entry in pending], batch_size, target_language,
+                                       use_smart_batching) if pending else []
+        
+        input_tokens = output_tokens = 0
+        busy_seconds = 0.0
+        requests_within_budget = 0
+        budget_left = True
+        for batch in batches:
+            batch_input, batch_output = self._estimate_batch_tokens(batch, target_language,
+                                                                    self._reference_translations(batch))
+            batch_output = min(batch_output, 4000)  # 与translate_batch中的max_tokens上限一致
+            
+            # 按顺序累计，统计预算耗尽前能发出的请求数
+            if budget_left:
+                if self.max_requests is not None and requests_within_budget >= self.max_requests:
+                    budget_left = False
+                elif (self.max_tokens_total is not None and
+                      input_tokens + output_tokens + batch_input + batch_output > self.max_tokens_total):
+                    budget_left = False
+                else:
+                    requests_within_budget += 1
+            input_tokens += batch_input
+            output_tokens += batch_output
+            busy_seconds += self.REQUEST_OVERHEAD_SECONDS + batch_output / self.OUTPUT_TOKENS_PER_SECOND
+        
+        if batches:
+            busy_seconds += self.BATCH_DELAY_SECONDS * (len(batches) - 1)
+        concurrency = max(concurrency, 1)
+        
+        return TranslationPlan(
+            entries_total=len(self.entries),
+            entries_to_send=len(pending),
+            entries_reused=len(prefills) + sum(len(group) for group in followers.values()),
+            requests=len(batches),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            estimated_seconds=busy_seconds / concurrency,
+            concurrency=concurrency,
+            requests_within_budget=requests_within_budget,
+        )
+    
+    def print_plan(self, plan: TranslationPlan, input_price: float = None, output_price: float = None):
+        """
+        打印翻译预估结果
+        
+        Args:
+            plan: plan_translation返回的预估结果
+            input_price: 每百万输入token的价格，None表示不估算费用
+            output_price: 每百万输出token的价格，None表示不估算费用
+        """
+        minutes, seconds = divmod(int(plan.estimated_seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        
+        print(f"\n翻译预估:")
+        print(f"总条目数: {plan.entries_total}")
+        print(f"需调用API的条目: {plan.entries_to_send}")
+        if plan.entries_reused:
+            print(f"由翻译记忆复用的条目: {plan.entries_reused}")
+        print(f"API请求数: {plan.requests}（不含重试）")
+        print(f"输入token: 约 {plan.input_tokens}")
+        print(f"输出token: 约 {plan.output_tokens}")
+        print(f"预计耗时: 约 {hours}小时{minutes}分{seconds}秒（并发数 {plan.concurrency}）")
+        if input_price is not None or output_price is not None:
+            cost = (plan.input_tokens * (input_price or 0) + plan.output_tokens * (output_price or 0)) / 1_000_000
+            print(f"预计费用: 约 {cost:.4f}")
+        if self.max_tokens_total is not None or self.max_requests is not None:
+            print(f"预算内可完成请求: {plan.requests_within_budget}/{plan.requests}")
+    
+    def translate_entries(self, batch_size: int = 10, target_language: str = "中文", use_smart_batching: bool = True,
+                          skip_translated: bool = False):
+        """
+        翻译所有条目
+        
+        Args:
+            batch_size: 每批翻译的条目数量（仅在不使用智能批处理时有效）
+            target_language: 目标语言
+            use_smart_batching: 是否使用智能批处理（考虑内容长度）
+            skip_translated: 是否跳过已有确定译文的条目（用于从中断处继续翻译）
+        """
+        if not self.entries:
+            print("没有找到需要翻译的条目")
+            return
+        
+        pending, followers, prefills = self._prepare_pending(skip_translated)
+        
+        for entry, translation, fuzzy in prefills:
+            entry.msgstr = translation
+            entry.fuzzy = fuzzy
+            if self.debug:
+                print(f"  [DEBUG] 翻译记忆命中: {entry.msgid} -> {entry.msgstr}")
+        
+        if self.translation_memory is not None:
+            grouped = sum(len(group) for group in followers.values())
+            print(f"翻译记忆：预填 {len(prefills)} 个条目，{grouped} 个等价条目将复用本次翻译结果，{len(pending)} 个条目需要调用API")
+        
+        if not pending:
+            print("没有需要调用API翻译的条目")
+            return
+        
+        print(f"开始翻译 {len(pending)} 个条目...")
+        
+        # 提取所有msgid
+        batches = self._create_batches([entry.msgid for entry in pending], batch_size, target_language,
+                                       use_smart_batching)
+        
         # 翻译每个批次
         total_translated = 0
         for i, batch_msgids in enumerate(batches):
@@ -445,26 +1010,159 @@ class POTranslator:
             try:
                 translations = self.translate_batch(batch_msgids, target_language)
                 
+                if self.budget_exhausted:
+                    remaining = sum(len(batch) for batch in batches[i:])
+                    print(f"已达到预算上限，停止翻译，剩余 {len(batches) - i} 批（{remaining} 个条目）未翻译")
+                    break
+                
                 # 更新翻译结果
                 start_idx = sum(len(batches[j]) for j in range(i))
                 for j, translation in enumerate(translations):
                     entry_idx = start_idx + j
-                    if entry_idx < len(self.entries) and translation.strip():
-                        self.entries[entry_idx].msgstr = translation
+                    if entry_idx < len(pending) and translation.strip():
+                        pending[entry_idx].msgstr = translation
+                        pending[entry_idx].fuzzy = False
                         total_translated += 1
                         
                 print(f"第 {i + 1} 批翻译完成，成功翻译 {sum(1 for t in translations if t.strip())} 个条目")
                 
                 # 添加延迟避免API限制
                 if i < len(batches) - 1:  # 不是最后一批
-                    time.sleep(1)
+                    time.sleep(self.BATCH_DELAY_SECONDS)
                 
             except Exception as e:
                 print(f"第 {i + 1} 批翻译失败: {e}")
                 continue
         
+        # 将代表条目的翻译结果填入其近似重复条目，并标记为fuzzy
+        for rep_idx, group in followers.items():
+            representative = pending[rep_idx]
+            if not representative.msgstr.strip():
+                continue
+            for entry in group:
+                entry.msgstr = TranslationMemory.adapt_numbers(representative.msgid, entry.msgid, representative.msgstr)
+                entry.fuzzy = entry.msgid != representative.msgid
+        
         print(f"\n翻译完成！总共翻译了 {total_translated} 个条目")
     
+    @staticmethod
+    def shard_of(key: str, shard_count: int) -> int:
+        """
+        按Key计算条目所属的分片（与进程和主机无关，结果确定）
+        
+        Args:
+            key: 条目Key
+            shard_count: 分片总数
+            
+        Returns:
+            分片序号
+        """
+        return zlib.crc32(key.encode('utf-8')) % shard_count
+    
+    @staticmethod
+    def _shard_file(shard_dir: str, shard_index: int, shard_count: int) -> str:
+        return os.path.join(shard_dir, f"shard-{shard_index:04d}-of-{shard_count:04d}.json")
+    
+    def select_shard(self, shard_index: int, shard_count: int) -> List[POEntry]:
+        """
+        只保留属于指定分片的条目
+        
+        Args:
+            shard_index: 分片序号（从0开始）
+            shard_count: 分片总数
+            
+        Returns:
+            该分片的条目列表
+        """
+        if shard_count < 1 or not 0 <= shard_index < shard_count:
+            raise ValueError(f"分片参数无效：序号 {shard_index}，总数 {shard_count}")
+        
+        self.entries = [entry for entry in self.entries if self.shard_of(entry.key, shard_count) == shard_index]
+        print(f"分片 {shard_index + 1}/{shard_count}：包含 {len(self.entries)} 个条目")
+        return self.entries
+    
+    def write_shard_result(self, shard_dir: str, shard_index: int, shard_count: int) -> str:
+        """
+        将当前分片的翻译结果写入分片目录（先写临时文件再替换，合并时不会读到写了一半的文件）
+        
+        Args:
+            shard_dir: 分片结果目录（可为多台主机共享的目录）
+            shard_index: 分片序号
+            shard_count: 分片总数
+            
+        Returns:
+            分片结果文件路径
+        """
+        os.makedirs(shard_dir, exist_ok=True)
+        shard_file = self._shard_file(shard_dir, shard_index, shard_count)
+        result = {
+            "shard_index": shard_index,
+            "shard_count": shard_count,
+            "entries": {
+                entry.key: {"msgid": entry.msgid, "msgstr": entry.msgstr, "fuzzy": entry.fuzzy}
+                for entry in self.entries
+            },
+        }
+        
+        tmp_file = f"{shard_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_file, shard_file)
+        
+        print(f"分片结果已保存到: {shard_file}")
+        return shard_file
+    
+    def merge_shard_results(self, shard_dir: str, shard_count: int, shard_indices: List[int] = None) -> List[int]:
+        """
+        读取分片结果并填入当前条目，之后可用write_po_file写出完整的.po文件
+        （原文已变化的条目不会被填入，以免把旧译文写到新原文上）
+        
+        Args:
+            shard_dir: 分片结果目录
+            shard_count: 分片总数
+            shard_indices: 要读取的分片序号，默认读取全部分片
+            
+        Returns:
+            缺失的分片序号列表
+        """
+        if shard_indices is None:
+            shard_indices = list(range(shard_count))
+        entry_dict = {entry.key: entry for entry in self.entries}
+        missing = []
+        merged = 0
+        mismatched = 0
+        
+        for shard_index in shard_indices:
+            shard_file = self._shard_file(shard_dir, shard_index, shard_count)
+            if not os.path.exists(shard_file):
+                missing.append(shard_index)
+                continue
+            
+            with open(shard_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            if result.get("shard_count") != shard_count or result.get("shard_index") != shard_index:
+                print(f"警告：分片文件与分片参数不一致，已跳过: {shard_file}")
+                missing.append(shard_index)
+                continue
+            
+            for key, translated in result["entries"].items():
+                entry = entry_dict.get(key)
+                if entry is None or not translated["msgstr"]:
+                    continue
+                if translated.get("msgid") != entry.msgid:
+                    mismatched += 1
+                    continue
+                entry.msgstr = translated["msgstr"]
+                entry.fuzzy = translated["fuzzy"]
+                merged += 1
+        
+        print(f"合并完成：{len(shard_indices) - len(missing)}/{len(shard_indices)} 个分片，共 {merged} 个译文")
+        if mismatched:
+            print(f"警告：{mismatched} 个条目的原文与分片结果不一致（.po文件可能已重新导出），已跳过")
+        if missing:
+            print(f"警告：以下分片缺失，对应条目保持原样: {', '.join(str(i) for i in missing)}")
+        return missing
+    
     def write_po_file(self, input_file: str, output_file: str = None):
         """
         将翻译结果写回.po文件
@@ -482,7 +1180,8 @@ class POTranslator:
         # 创建条目字典以便快速查找
         entry_dict = {entry.key: entry for entry in self.entries}
         
-        # 修改文件内容
+        # 修改文件内容（fuzzy标记可能增删行，因此写入新列表）
+        output_lines = []
         i = 0
         while i < len(lines):
             line = lines[i].strip()
@@ -493,37 +1192,72 @@ class POTranslator:
                 
                 if key in entry_dict:
                     entry = entry_dict[key]
-                    
-                    # 查找msgstr行并替换
-                    j = i
-                    while j < len(lines) and j <= entry.line_end:
-                        if lines[j].strip().startswith('msgstr'):
-                            # 替换msgstr行
-                            if entry.msgstr:
-                                lines[j] = f'msgstr "{entry.msgstr}"\n'
-                            break
-                        j += 1
-                    
-                    i = entry.line_end
-                else:
-                    i += 1
-            else:
-                i += 1
+                    output_lines.extend(self._render_entry_lines(lines[i:max(entry.line_end, i + 1)], entry))
+                    i = max(entry.line_end, i + 1)
+                    continue
+            
+            output_lines.append(lines[i])
+            i += 1
         
         # 写入文件
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+            f.writelines(output_lines)
         
         print(f"翻译结果已保存到: {output_file}")
     
+    def _render_entry_lines(self, block: List[str], entry: POEntry) -> List[str]:
+        """
+        按条目的翻译结果和fuzzy状态生成该条目在文件中的行
+        
+        Args:
+            block: 条目在原文件中的行
+            entry: 对应的PO条目
+            
+        Returns:
+            更新后的行列表
+        """
+        block = list(block)
+        
+        # 替换msgstr行
+        for j, block_line in enumerate(block):
+            if block_line.strip().startswith('msgstr'):
+                if entry.msgstr:
+                    block[j] = f'msgstr "{entry.msgstr}"\n'
+                break
+        
+        # 同步"#,"标记行中的fuzzy标记
+        flag_idx = next((j for j, block_line in enumerate(block) if block_line.strip().startswith('#,')), None)
+        if flag_idx is not None:
+            flags = [flag.strip() for flag in block[flag_idx].strip()[2:].split(',') if flag.strip()]
+            has_fuzzy = 'fuzzy' in flags
+            if entry.fuzzy and not has_fuzzy:
+                block[flag_idx] = "#, " + ", ".join(['fuzzy'] + flags) + "\n"
+            elif not entry.fuzzy and has_fuzzy:
+                flags.remove('fuzzy')
+                if flags:
+                    block[flag_idx] = "#, " + ", ".join(flags) + "\n"
+                else:
+                    del block[flag_idx]
+        elif entry.fuzzy:
+            # 标记行位于注释之后、msgctxt/msgid之前
+            insert_at = 0
+            while insert_at < len(block) and block[insert_at].strip().startswith('#'):
+                insert_at += 1
+            block.insert(insert_at, "#, fuzzy\n")
+        
+        return block
+    
     def print_summary(self):
         """打印翻译摘要"""
         total = len(self.entries)
         translated = sum(1 for entry in self.entries if entry.msgstr and entry.msgstr.strip())
+        fuzzy = sum(1 for entry in self.entries if entry.fuzzy and entry.msgstr and entry.msgstr.strip())
         
         print(f"\n翻译摘要:")
         print(f"总条目数: {total}")
         print(f"已翻译: {translated}")
+        if fuzzy:
+            print(f"其中模糊匹配（fuzzy）: {fuzzy}")
         print(f"未翻译: {total - translated}")
         print(f"翻译率: {translated/total*100:.1f}%" if total > 0 else "翻译率: 0%")
 
@@ -531,15 +1265,30 @@ class POTranslator:
 def main():
     parser = argparse.ArgumentParser(description="PO文件自动翻译工具")
     parser.add_argument("po_file", help=".po文件路径")
-    parser.add_argument("--api-key", required=True, help="DeepSeek API密钥")
+    parser.add_argument("--api-key", help="DeepSeek API密钥（使用--dry-run、--mock或--merge-shards时可省略）")
     parser.add_argument("--api-url", help="API URL（可选）")
     parser.add_argument("--output", "-o", help="输出文件路径（默认覆盖原文件）")
     parser.add_argument("--batch-size", type=int, default=10, help="每批翻译的条目数量（仅在禁用智能批处理时使用）")
     parser.add_argument("--max-chars", type=int, default=4000, help="每次API请求的最大字符数")
     parser.add_argument("--language", default="中文", help="目标语言")
     parser.add_argument("--no-smart-batching", action="store_true", help="禁用智能批处理，使用固定批次大小")
-    parser.add_argument("--dry-run", action="store_true", help="只解析文件，不进行翻译")
+    parser.add_argument("--dry-run", action="store_true", help="只解析文件并预估请求数、token数和耗时，不进行翻译")
     parser.add_argument("--debug", action="store_true", help="启用调试模式，输出详细的API交互信息")
+    parser.add_argument("--fuzzy-match", action="store_true", help="启用模糊翻译记忆，只在数字、标点或大小写上不同的条目直接预填并标记为fuzzy")
+    parser.add_argument("--fuzzy-threshold", type=float, default=0.9, help="相似条目作为参考译文附入提示词的相似度阈值（0-1，默认0.9）")
+    parser.add_argument("--tm-file", action="append", default=[], help="作为翻译记忆来源的已翻译.po文件（可多次指定）")
+    parser.add_argument("--max-tokens-total", type=int, help="本次运行允许消耗的token总数上限，达到后停止翻译并保存已有结果")
+    parser.add_argument("--max-requests", type=int, help="本次运行允许发送的API请求数上限（含重试），达到后停止翻译并保存已有结果")
+    parser.add_argument("--skip-translated", action="store_true", help="跳过已有译文的条目，用于从中断处继续翻译")
+    parser.add_argument("--concurrency", type=int, default=1, help="预估耗时时假设的并发请求数（默认1，当前翻译流程为串行）")
+    parser.add_argument("--input-price", type=float, help="每百万输入token的价格，用于--dry-run费用预估")
+    parser.add_argument("--output-price", type=float, help="每百万输出token的价格，用于--dry-run费用预估")
+    parser.add_argument("--mock", action="store_true", help="使用模拟后端，不调用API（用于本地测试）")
+    parser.add_argument("--shard-count", type=int, help="分片总数，按Key将条目确定地分为N个分片")
+    parser.add_argument("--shard-index", type=int, help="当前工作进程处理的分片序号（0到N-1），结果写入--shard-dir")
+    parser.add_argument("--shard-dir", help="分片结果目录（可为多台主机共享的目录）")
+    parser.add_argument("--merge-shards", action="store_true", help="合并--shard-dir中的所有分片结果并写出.po文件")
+    parser.add_argument("--allow-partial-merge", action="store_true", help="合并时允许部分分片缺失（缺失分片的条目保持原样）")
     
     args = parser.parse_args()
     
@@ -547,28 +1296,86 @@ def main():
         print(f"错误：文件不存在 {args.po_file}")
         return
     
+    # 分片参数在解析文件前校验，避免参数有误时仍去解析文件或误把整个文件交给API翻译
+    if args.shard_count is not None and args.shard_count < 1:
+        print("错误：--shard-count 必须为正整数")
+        sys.exit(1)
+    sharded = args.shard_index is not None or args.merge_shards
+    if sharded and (not args.shard_count or not args.shard_dir):
+        print("错误：分片模式需要同时指定 --shard-count 和 --shard-dir")
+        sys.exit(1)
+    if not sharded and (args.shard_count is not None or args.shard_dir):
+        print("错误：--shard-count/--shard-dir 需要配合 --shard-index 或 --merge-shards 使用")
+        sys.exit(1)
+    if args.shard_index is not None and args.merge_shards:
+        print("错误：--shard-index 与 --merge-shards 不能同时使用")
+        sys.exit(1)
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shard_count:
+        print(f"错误：--shard-index 应在 0 到 {args.shard_count - 1} 之间")
+        sys.exit(1)
+    
+    if not args.api_key and not args.mock and not args.merge_shards and not args.dry_run:
+        print("错误：请指定 --api-key（或使用 --mock）")
+        return
+    
     # 初始化翻译器
-    translator = POTranslator(args.api_key, args.api_url, args.max_chars, args.debug)
+    translator = POTranslator(args.api_key, args.api_url, args.max_chars, args.debug,
+                              args.max_tokens_total, args.max_requests, args.mock)
     
     # 解析PO文件
     print(f"正在解析文件: {args.po_file}")
     entries = translator.parse_po_file(args.po_file)
     print(f"解析完成，找到 {len(entries)} 个待翻译条目")
     
+    output_file = args.output or args.po_file
+    
+    if args.merge_shards:
+        missing = translator.merge_shard_results(args.shard_dir, args.shard_count)
+        if missing and not args.allow_partial_merge:
+            print("错误：分片结果不完整，未写出文件。确认需要部分合并时请加上 --allow-partial-merge")
+            sys.exit(1)
+        translator.write_po_file(args.po_file, output_file)
+        translator.print_summary()
+        return
+    
+    # 分片继续翻译时先载入该分片之前的结果（同时作为翻译记忆来源）
+    if args.shard_index is not None and args.skip_translated:
+        translator.merge_shard_results(args.shard_dir, args.shard_count, [args.shard_index])
+    
+    if args.fuzzy_match or args.tm_file:
+        translator.enable_fuzzy_matching(args.fuzzy_threshold, args.tm_file)
+    
+    # 翻译记忆基于完整文件构建，之后只保留当前分片的条目
+    if args.shard_index is not None:
+        translator.select_shard(args.shard_index, args.shard_count)
+    
+    use_smart_batching = not args.no_smart_batching
+    
     if args.dry_run:
+        plan = translator.plan_translation(args.batch_size, args.language, use_smart_batching,
+                                           args.skip_translated, args.concurrency)
+        translator.print_plan(plan, args.input_price, args.output_price)
         translator.print_summary()
         return
     
     # 执行翻译
-    use_smart_batching = not args.no_smart_batching
-    translator.translate_entries(args.batch_size, args.language, use_smart_batching)
+    translator.translate_entries(args.batch_size, args.language, use_smart_batching, args.skip_translated)
     
-    # 写入结果
-    output_file = args.output or args.po_file
-    translator.write_po_file(args.po_file, output_file)
+    # 写入结果（达到预算上限时即为检查点）
+    if args.shard_index is not None:
+        output_file = translator.write_shard_result(args.shard_dir, args.shard_index, args.shard_count)
+    else:
+        translator.write_po_file(args.po_file, output_file)
     
     # 打印摘要
     translator.print_summary()
+    
+    if translator.budget_exhausted:
+        print(f"\n已达到预算上限，已翻译的结果已保存到: {output_file}")
+        if args.shard_index is not None:
+            print("可使用相同参数并加上 --skip-translated 重新运行该分片，继续翻译剩余条目")
+        else:
+            print("可对该文件使用 --skip-translated 参数继续翻译剩余条目")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+po_translator.py 的测试
+运行: python -m pytest -q 或 python -m unittest
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from po_translator import POTranslator
+
+SETTINGS = ["graphics", "audio", "controls", "network", "display", "gameplay", "camera", "interface",
+            "keyboard", "gamepad", "subtitle", "language", "account", "privacy", "storage", "overlay"]
+
+
+def _po_entry(key: str, msgid: str, msgstr: str = "") -> str:
+    return (f'#. Key:\t{key}\n'
+            f'#. SourceLocation:\t/Game/Test.{key}\n'
+            f'#: /Game/Test.{key}\n'
+            f'msgctxt ",{key}"\n'
+            f'msgid "{msgid}"\n'
+            f'msgstr "{msgstr}"\n\n')
+
+
+def _write_po(path: str, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('msgid ""\nmsgstr ""\n\n')
+        for key, msgid, msgstr in entries:
+            f.write(_po_entry(key, msgid, msgstr))
+
+
+def _long_source(setting: str, variant: str) -> str:
+    return f"Open the advanced {setting} configuration panel and {variant} every option in this section"
+
+
+class SmartBatchingWithReferencesTest(unittest.TestCase):
+    """启用翻译记忆后，--max-chars 仍需限制实际发送的提示词（包含参考译文）"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.po_file = os.path.join(self.tmp_dir.name, "test.po")
+        self.tm_file = os.path.join(self.tmp_dir.name, "tm.po")
+
+        translated = [(f"T{i}", _long_source(SETTINGS[i], "reset"), f"译文{i}") for i in range(16)]
+        pending = [(f"P{i}", _long_source(SETTINGS[i], "review"), "") for i in range(16)]
+        _write_po(self.tm_file, translated)
+        _write_po(self.po_file, pending)
+        _write_po(os.path.join(self.tmp_dir.name, "both.po"), translated + pending)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _check_limit(self, translator: POTranslator):
+        with redirect_stdout(io.StringIO()):
+            pending, _, _ = translator._prepare_pending()
+        msgids = [entry.msgid for entry in pending]
+        self.assertEqual(len(msgids), 16)
+
+        # 参考译文确实被附带，测试才有意义
+        references = translator._reference_translations(msgids[:3])
+        self.assertEqual(len(references), 3)
+
+        # 将上限设为恰好容纳前3个条目的提示词长度
+        limit = len(translator._build_prompt(msgids[:3], "中文", references))
+        translator.max_chars_per_request = limit
+
+        batches = translator._create_smart_batches(msgids, "中文")
+        self.assertEqual(batches[0], msgids[:3])
+        self.assertEqual(sum(batches, []), msgids)
+        for batch in batches:
+            prompt = translator._build_prompt(batch, "中文", translator._reference_translations(batch))
+            self.assertLessEqual(len(prompt), limit)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            for batch in batches:
+                translator.translate_batch(batch, "中文")
+        self.assertNotIn("批次内容过长", output.getvalue())
+
+    def test_limit_holds_with_fuzzy_match(self):
+        translator = POTranslator(mock=True)
+        with redirect_stdout(io.StringIO()):
+            translator.parse_po_file(os.path.join(self.tmp_dir.name, "both.po"))
+            translator.enable_fuzzy_matching()
+        self._check_limit(translator)
+
+    def test_limit_holds_with_tm_file(self):
+        translator = POTranslator(mock=True)
+        with redirect_stdout(io.StringIO()):
+            translator.parse_po_file(self.po_file)
+            translator.enable_fuzzy_matching(tm_files=[self.tm_file])
+        self._check_limit(translator)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,6 +20,12 @@ def main():
         max_chars_per_request = getattr(config, 'MAX_CHARS_PER_REQUEST', 4000)
         use_smart_batching = getattr(config, 'USE_SMART_BATCHING', True)
         debug = getattr(config, 'DEBUG', False)
+        fuzzy_match = getattr(config, 'FUZZY_MATCH', False)
+        fuzzy_threshold = getattr(config, 'FUZZY_THRESHOLD', 0.9)
+        tm_files = getattr(config, 'TM_FILES', [])
+        max_tokens_total = getattr(config, 'MAX_TOKENS_TOTAL', None)
+        max_requests = getattr(config, 'MAX_REQUESTS', None)
+        skip_translated = getattr(config, 'SKIP_TRANSLATED', False)
         po_file = config.PO_FILE_PATH
         output_file = getattr(config, 'OUTPUT_FILE_PATH', None)
     except ImportError:
@@ -44,6 +50,7 @@ def main():
     print(f"目标语言: {target_language}")
     print(f"智能批处理: {'启用' if use_smart_batching else '禁用'}")
     print(f"调试模式: {'启用' if debug else '禁用'}")
+    print(f"模糊翻译记忆: {'启用' if fuzzy_match or tm_files else '禁用'}")
     if use_smart_batching:
         print(f"最大字符数/请求: {max_chars_per_request}")
     else:
@@ -57,7 +64,7 @@ def main():
         print("翻译已取消")
         return False
       # 初始化翻译器
-    translator = POTranslator(api_key, api_url, max_chars_per_request, debug)
+    translator = POTranslator(api_key, api_url, max_chars_per_request, debug, max_tokens_total, max_requests)
     
     try:
         # 解析PO文件
@@ -69,6 +76,9 @@ def main():
             print("没有找到需要翻译的条目")
             return True
         
+        if fuzzy_match or tm_files:
+            translator.enable_fuzzy_matching(fuzzy_threshold, tm_files)
+        
         # 显示一些示例条目
         print("\n前几个待翻译条目示例:")
         for i, entry in enumerate(entries[:5]):
@@ -77,14 +87,16 @@ def main():
             print(f"... 还有 {len(entries) - 5} 个条目")
           # 最终确认
         batching_info = "智能批处理（基于内容长度）" if use_smart_batching else f"固定批处理（每批{batch_size}个）"
-        print(f"\n将翻译 {len(entries)} 个条目，使用{batching_info}")
+        plan = translator.plan_translation(batch_size, target_language, use_smart_batching, skip_translated)
+        translator.print_plan(plan)
+        print(f"\n将翻译 {plan.entries_to_send} 个条目，使用{batching_info}，预计需要 {plan.requests} 次API调用")
         final_confirm = input("确认继续？(y/N): ").strip().lower()
         if final_confirm not in ['y', 'yes', '是']:
             print("翻译已取消")
             return False
         
         # 执行翻译
-        translator.translate_entries(batch_size, target_language, use_smart_batching)
+        translator.translate_entries(batch_size, target_language, use_smart_batching, skip_translated)
         
         # 写入结果
         translator.write_po_file(po_file, output_file)
@@ -92,6 +104,10 @@ def main():
         # 打印摘要
         translator.print_summary()
         
+        if translator.budget_exhausted:
+            print("\n已达到预算上限，已翻译的结果已保存。可设置SKIP_TRANSLATED = True后对输出文件继续翻译")
+            return True
+        
         print("\n翻译完成！")
         return True
         